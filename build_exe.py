@@ -4,9 +4,47 @@ Build script to create a Windows executable using PyInstaller.
 """
 
 import os
+import re
 import sys
 import subprocess
 from pathlib import Path
+import importlib
+from importlib.metadata import version, PackageNotFoundError
+
+# Minimum versions of the packages needed to build the executable
+BUILD_REQUIREMENTS = {
+    "pip": "23.1",
+    "setuptools": "68.0",
+    "wheel": "0.40",
+    "pyinstaller": "6.1.0",
+    "libratom": "0.7.1",
+}
+
+try:
+    from packaging.version import Version as parse_version
+except ImportError:
+    def parse_version(text):
+        """
+        Turn a version string such as '68.2.0' into a tuple of ints.
+
+        Only used when packaging is not installed; pre-release and local
+        suffixes are ignored, so '6.1.0rc1' compares equal to '6.1.0'.
+        """
+        match = re.match(r"\d+(?:\.\d+)*", text)
+        return tuple(int(part) for part in match.group().split(".")) if match else ()
+
+def find_outdated_requirements():
+    """Return the build requirements that are not installed or older than required."""
+    outdated = []
+    for name, minimum in BUILD_REQUIREMENTS.items():
+        try:
+            installed = version(name)
+        except PackageNotFoundError:
+            outdated.append(name)
+            continue
+        if parse_version(installed) < parse_version(minimum):
+            outdated.append(name)
+    return outdated
 
 def build_executable():
     """Build the PST to mbox converter as a Windows executable."""
@@ -21,39 +59,35 @@ def build_executable():
     # in such an environment the import error bubbles up from pip's build
     # backend, preventing the executable from being created.  Upgrading the
     # standard build trio here keeps the user on a compatible version before we
-    # attempt to import the project dependencies.
-    print("Ensuring packaging tools are up to date...")
-    subprocess.run(
-        [
-            sys.executable,
-            "-m",
-            "pip",
-            "install",
-            "--upgrade",
-            "pip",
-            "setuptools",
-            "wheel",
-        ],
-        check=True,
-    )
+    # attempt to import the project dependencies.  Installed versions are
+    # checked first so pip only runs, once, when something actually needs it.
+    print("Checking build requirements...")
+    outdated = find_outdated_requirements()
+    if outdated:
+        print(f"❌ Missing or outdated: {', '.join(outdated)}. Installing...")
+        subprocess.run(
+            [sys.executable, "-m", "pip", "install", "--upgrade"]
+            + [f"{name}>={BUILD_REQUIREMENTS[name]}" for name in outdated],
+            check=True,
+        )
+        importlib.invalidate_caches()
+        print("✓ Build requirements installed")
 
-    # Check if PyInstaller is available
+    # Check that PyInstaller is available
     try:
         import PyInstaller
         print(f"✓ PyInstaller found: {PyInstaller.__version__}")
     except ImportError:
-        print("❌ PyInstaller not found. Installing...")
-        subprocess.run([sys.executable, "-m", "pip", "install", "pyinstaller"])
-        print("✓ PyInstaller installed")
-    
-    # Check if libratom is available
+        print("❌ PyInstaller not found. Install it with: pip install pyinstaller")
+        return False
+
+    # Check that libratom is available
     try:
         import libratom
         print(f"✓ libratom found: {libratom.__version__}")
     except ImportError:
-        print("❌ libratom not found. Installing...")
-        subprocess.run([sys.executable, "-m", "pip", "install", "libratom"])
-        print("✓ libratom installed")
+        print("❌ libratom not found. Install it with: pip install libratom")
+        return False
     
     print()
     print("🔨 Building executable...")
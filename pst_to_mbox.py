@@ -5,18 +5,23 @@ A command-line tool for converting Outlook PST files to mbox format for webmail
 """
 
 import argparse
+import gc
+import io
 import os
 import sys
 import logging
-import mailbox
 import email
 import re
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
-from email import encoders
+from email.generator import BytesGenerator
+from email.header import Header
 from pathlib import Path
 import time
+import uuid
+import functools
+from collections import deque
 from datetime import datetime
 import base64
 
@@ -26,10 +31,163 @@ except ImportError:
     print("Error: libratom library is required. Install it with: pip install libratom")
     sys.exit(1)
 
+# Serialized messages are collected in memory and written to the mbox file in
+# batches of at least this many bytes
+MBOX_BATCH_SIZE = 8 << 20
+
+# Transport header fields used when the PST message lacks native properties
+TRANSPORT_FROM_RE = re.compile(r'^From:\s*(.+?)\s*<(.+?)>', re.MULTILINE | re.IGNORECASE)
+TRANSPORT_DATE_RE = re.compile(r'^Date:\s*(.+)', re.MULTILINE | re.IGNORECASE)
+# Message-ID prefers the <...> form and falls back to the first token; the
+# value may be folded onto the next line
+TRANSPORT_MSGID_RE = re.compile(r'^Message-ID:[ \t]*(?:\r?\n[ \t]+)?(<[^>\r\n]+>|\S+)', re.MULTILINE | re.IGNORECASE)
+
+# Attachments larger than this (in MB) are replaced by a placeholder part
+DEFAULT_MAX_ATTACHMENT_MB = 100
+
+# Run a young-generation garbage collection every this many messages
+GC_INTERVAL = 1000
+
+# Attachment bytes are base64-encoded in chunks of this size; a multiple of 57
+# so every chunk encodes to complete 76-character lines
+ATTACHMENT_CHUNK_SIZE = 57 * 1024
+
+
+class StreamedAttachment(MIMEBase):
+    """
+    Attachment part whose data is base64-encoded straight to the output file.
+
+    Unlike MIMEBase + encoders.encode_base64, no encoded copy of the data is kept
+    on the message. The data itself is only loaded, through the ``read`` callable,
+    when the part is written, and is released right after.
+    """
+    
+    def __init__(self, read, filename):
+        super().__init__('application', 'octet-stream')
+        self['Content-Transfer-Encoding'] = 'base64'
+        self.add_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.read = read
+    
+    def write_to(self, out, data):
+        """Write the part headers and base64-encoded data to a binary stream."""
+        for name, value in self.items():
+            out.write(self.policy.fold_binary(name, value))
+        out.write(b'\n')
+        view = memoryview(data)
+        for i in range(0, len(view), ATTACHMENT_CHUNK_SIZE):
+            out.write(base64.encodebytes(view[i:i + ATTACHMENT_CHUNK_SIZE]))
+
+
+class MboxWriter:
+    """
+    Append email messages to an open mbox file.
+
+    All messages are serialized by one BytesGenerator into an in-memory batch,
+    which is written to the file once it holds at least ``batch_size`` bytes.
+    Streamed attachments bypass the batch and are encoded straight to the file.
+    """
+
+    def __init__(self, mbox_file, batch_size=MBOX_BATCH_SIZE):
+        self.mbox_file = mbox_file
+        self.batch_size = batch_size
+        self.batch = io.BytesIO()
+        # mangle_from_ escapes body lines starting with "From " so they are not
+        # mistaken for message separators by mbox readers
+        self.generator = BytesGenerator(self.batch, mangle_from_=True)
+        # Batch offset where the entry being written starts
+        self._entry_start = 0
+        # Set once part of the entry being written has reached the file
+        self._entry_flushed = False
+        self.logger = logging.getLogger(__name__)
+
+    def write_message(self, msg):
+        """Add an email message as an mbox entry (From_ line, message, blank line)."""
+        self._entry_start = self.batch.tell()
+        self._entry_flushed = False
+        try:
+            self._write_entry(msg)
+        except Exception:
+            # Drop whatever part of the message is still in the batch; anything
+            # flushed ahead of a streamed attachment is already in the file
+            self.batch.seek(self._entry_start)
+            self.batch.truncate()
+            if self._entry_flushed:
+                self.logger.warning("Wrote a truncated mbox entry after an output error")
+            raise
+
+        if self.batch.tell() >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the pending batch to the mbox file."""
+        with self.batch.getbuffer() as pending:
+            self.mbox_file.write(pending)
+        self.batch.seek(0)
+        self.batch.truncate()
+        self._entry_start = 0
+
+    def _write_entry(self, msg):
+        out = self.batch
+        from_line = msg.get_unixfrom() or f"From MAILER-DAEMON {time.asctime(time.gmtime())}"
+        out.write(from_line.encode('ascii', 'replace') + b'\n')
+
+        if not msg.is_multipart() or not any(isinstance(part, StreamedAttachment) for part in msg.get_payload()):
+            self.generator.flatten(msg)
+            self._end_line()
+            out.write(b'\n')
+            return
+
+        # Attachments are streamed, so the multipart container is written by hand
+        if not msg.get_boundary():
+            msg.set_boundary(f"==============={uuid.uuid4().hex}==")
+        boundary = msg.get_boundary().encode('ascii')
+
+        # Read and serialize every part before anything is flushed, so once the
+        # entry has started to reach the file only I/O errors can interrupt it
+        parts = []
+        for part in msg.get_payload():
+            if isinstance(part, StreamedAttachment):
+                data = part.read()
+                if not data:
+                    continue
+                # memoryview() rejects anything that is not bytes-like
+                parts.append((part, memoryview(data)))
+            else:
+                parts.append((None, self._serialize(part)))
+
+        for name, value in msg.items():
+            out.write(msg.policy.fold_binary(name, value))
+        out.write(b'\n')
+        for i, (part, data) in enumerate(parts):
+            out.write(b'--' + boundary + b'\n')
+            if part is None:
+                out.write(data)
+            else:
+                # Keep the encoded attachment out of the batch
+                self.flush()
+                self._entry_flushed = True
+                part.write_to(self.mbox_file, data)
+            # Release each attachment as soon as it is written
+            parts[i] = data = None
+            out.write(b'\n')
+        out.write(b'--' + boundary + b'--\n\n')
+
+    def _serialize(self, part):
+        buf = io.BytesIO()
+        BytesGenerator(buf, mangle_from_=True).flatten(part)
+        return buf.getvalue()
+
+    def _end_line(self):
+        # mbox entries must end with a newline before the separating blank line
+        self.batch.seek(-1, io.SEEK_CUR)
+        if self.batch.read(1) != b'\n':
+            self.batch.write(b'\n')
+
+
 class PSTToMboxConverter:
     """Convert PST files to mbox format with progress tracking and error handling."""
     
-    def __init__(self, pst_file, output_file, verbose=False):
+    def __init__(self, pst_file, output_file, verbose=False, max_attachment_mb=DEFAULT_MAX_ATTACHMENT_MB):
         """
         Initialize the converter.
         
@@ -37,18 +195,32 @@ class PSTToMboxConverter:
             pst_file (str): Path to the input PST file
             output_file (str): Path to the output mbox file
             verbose (bool): Enable verbose logging
+            max_attachment_mb (float): Skip attachments larger than this many MB (0 disables the limit)
         """
         self.pst_file = Path(pst_file)
         self.output_file = Path(output_file)
         self.verbose = verbose
+        if max_attachment_mb < 0:
+            raise ValueError(f"max_attachment_mb must not be negative: {max_attachment_mb}")
+        self.max_attachment_mb = max_attachment_mb
+        self.max_attachment_bytes = int(max_attachment_mb * 1024 * 1024) if max_attachment_mb else None
         self.processed_emails = 0
         self.failed_emails = 0
         self.processed_folders = 0
+        self.failed_folders = 0
         self.total_size = 0
         self.attachments_found = 0
         self.attachments_extracted = 0
+        self.attachments_skipped = 0
         self.attachment_bytes = 0
         
+        # hasattr() results per (type, attribute), see has_capability()
+        self._capabilities = {}
+        
+        # (second, From_ line date, Date header) for messages without a date,
+        # see fallback_dates()
+        self._now_cache = (None, None, None)
+        
         # Setup logging
         log_level = logging.DEBUG if verbose else logging.INFO
         logging.basicConfig(
@@ -99,27 +271,29 @@ class PSTToMboxConverter:
             return ""
         
         if name and name.strip():
-            # Handle non-ASCII characters in name
-            try:
-                name = name.encode('ascii')
-                return f"{name.decode('ascii')} <{address}>"
-            except UnicodeEncodeError:
-                # Use RFC 2047 encoding for non-ASCII names
-                from email.header import Header
-                encoded_name = Header(name, 'utf-8').encode()
-                return f"{encoded_name} <{address}>"
+            if name.isascii():
+                return f"{name} <{address}>"
+            # Use RFC 2047 encoding for non-ASCII names
+            encoded_name = Header(name, 'utf-8').encode()
+            return f"{encoded_name} <{address}>"
         
         return address
     
     def extract_attachments(self, pst_message):
-        """Extract attachment information from PST message."""
+        """
+        Extract attachment metadata from PST message.
+
+        Attachment data is not read here; each entry carries a 'read' callable
+        that loads the data on demand when the attachment is written.
+        """
         attachments = []
 
         try:
-            if hasattr(pst_message, 'number_of_attachments'):
+            if self.has_capability(pst_message, 'number_of_attachments'):
                 attachment_count = pst_message.number_of_attachments
                 if attachment_count > 0:
-                    self.logger.debug(f"Message has {attachment_count} attachment(s)")
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        self.logger.debug("Message has %d attachment(s)", attachment_count)
                     self.attachments_found += attachment_count
                 for i in range(attachment_count):
                     try:
@@ -127,41 +301,22 @@ class PSTToMboxConverter:
                         if attachment:
                             filename = self.safe_get_attr(attachment, 'name', f"attachment_{i}") or f"attachment_{i}"
                             size = self.safe_get_attr(attachment, 'size', 0) or 0
-
-                            # Try multiple methods to get attachment data
-                            data = None
-
-                            # Method 1: Try read_buffer if available (libpff native method)
-                            if data is None and hasattr(attachment, 'read_buffer') and size > 0:
-                                try:
-                                    data = attachment.read_buffer(size)
-                                except Exception as e:
-                                    self.logger.debug(f"read_buffer failed for '{filename}': {e}")
-
-                            # Method 2: Try get_data if available
-                            if data is None and hasattr(attachment, 'get_data'):
-                                try:
-                                    data = attachment.get_data()
-                                except Exception as e:
-                                    self.logger.debug(f"get_data failed for '{filename}': {e}")
-
-                            # Method 3: Try data property
-                            if data is None:
-                                data = self.safe_get_attr(attachment, 'data', None)
-
-                            actual_size = len(data) if data else 0
+                            if self.max_attachment_bytes and size > self.max_attachment_bytes:
+                                # Never load oversized attachments, see build_email()
+                                read = None
+                                self.attachments_skipped += 1
+                                self.logger.warning(
+                                    f"Skipping attachment '{filename}' ({size} bytes): "
+                                    f"larger than {self.max_attachment_mb} MB"
+                                )
+                            else:
+                                read = functools.partial(self.read_attachment_data, attachment, filename, size)
                             att_info = {
                                 'filename': filename,
                                 'size': size,
-                                'data': data
+                                'read': read
                             }
                             attachments.append(att_info)
-                            if actual_size == 0 and size > 0:
-                                self.logger.warning(f"Attachment '{filename}' reported size {size} but data is empty")
-                            else:
-                                self.attachments_extracted += 1
-                                self.attachment_bytes += actual_size
-                                self.logger.debug(f"Found attachment: {filename} ({actual_size} bytes)")
                     except (SystemError, ValueError, UnicodeDecodeError, OverflowError) as e:
                         self.logger.warning(f"Failed to extract attachment {i}: {e}")
         except Exception as e:
@@ -169,24 +324,122 @@ class PSTToMboxConverter:
 
         return attachments
     
+    def read_attachment_data(self, attachment, filename, size):
+        """Read the data of a PST attachment, returning None if it cannot be read."""
+        # Try multiple methods to get attachment data
+        data = None
+
+        # Method 1: Try read_buffer if available (libpff native method)
+        if data is None and self.has_capability(attachment, 'read_buffer') and size > 0:
+            try:
+                data = attachment.read_buffer(size)
+            except Exception as e:
+                self.logger.debug("read_buffer failed for '%s': %s", filename, e)
+
+        # Method 2: Try get_data if available
+        if data is None and self.has_capability(attachment, 'get_data'):
+            try:
+                data = attachment.get_data()
+            except Exception as e:
+                self.logger.debug("get_data failed for '%s': %s", filename, e)
+
+        # Method 3: Try data property
+        if data is None:
+            data = self.safe_get_attr(attachment, 'data', None)
+
+        actual_size = len(data) if data else 0
+        if actual_size == 0 and size > 0:
+            self.logger.warning(f"Attachment '{filename}' reported size {size} but data is empty")
+        else:
+            self.attachments_extracted += 1
+            self.attachment_bytes += actual_size
+            self.logger.debug("Found attachment: %s (%d bytes)", filename, actual_size)
+
+        return data
+    
+    def has_capability(self, obj, attr):
+        """
+        Cached hasattr() check.
+
+        libpff objects of the same type all expose the same attributes, so each
+        attribute is only probed once per type instead of once per object.
+        """
+        key = (type(obj), attr)
+        found = self._capabilities.get(key)
+        if found is None:
+            found = self._capabilities[key] = hasattr(obj, attr)
+        return found
+    
     def safe_get_attr(self, obj, attr, default=''):
         """Safely get an attribute, catching Unicode decode errors from corrupted PST data."""
         try:
             value = getattr(obj, attr, default)
             return value if value is not None else default
         except (SystemError, ValueError, UnicodeDecodeError, OverflowError) as e:
-            self.logger.debug(f"Failed to read attribute '{attr}': {e}")
+            self.logger.debug("Failed to read attribute '%s': %s", attr, e)
             return default
 
-    def convert_pst_message_to_email(self, pst_message, folder_path=""):
-        """Convert a PST message to an email.message.Message object."""
+    def read_pst_message(self, pst_message, folder_path=""):
+        """
+        Read everything needed to build an email from a PST message.
+
+        All access to the underlying libpff objects happens here, so the returned
+        dict can be turned into an email by build_email() without touching libpff.
+        """
+        # Body content - use safe accessor to handle corrupted strings
+        record = {
+            'body_text': self.safe_get_attr(pst_message, 'plain_text_body', '') or "",
+            'body_html': self.safe_get_attr(pst_message, 'html_body', '') or "",
+            'attachments': self.extract_attachments(pst_message),
+            'subject': self.safe_get_attr(pst_message, 'subject', ''),
+            'sender_name': self.safe_get_attr(pst_message, 'sender_name', ''),
+            'sender_email': self.safe_get_attr(pst_message, 'sender_email_address', ''),
+            'transport_headers': self.safe_get_attr(pst_message, 'transport_headers', ''),
+            'delivery_time': self.safe_get_attr(pst_message, 'delivery_time', None),
+            'recipients': [],
+            'folder_path': folder_path,
+        }
+        
+        # Recipients, skipped outright when the message reports none
+        if self.safe_get_attr(pst_message, 'number_of_recipients', None) != 0:
+            try:
+                if self.has_capability(pst_message, 'recipients') and pst_message.recipients:
+                    # Append one at a time so recipients read before a failure are kept
+                    for recipient in pst_message.recipients:
+                        recipient_email = self.safe_get_attr(recipient, 'email_address', '')
+                        if recipient_email:
+                            record['recipients'].append(
+                                (recipient_email, self.safe_get_attr(recipient, 'name', ''))
+                            )
+            except (SystemError, ValueError, UnicodeDecodeError, OverflowError) as e:
+                self.logger.debug("Failed to read recipients: %s", e)
+        
+        return record
+    
+    def fallback_dates(self):
+        """
+        Return the current time formatted for the From_ line and the Date header.
+
+        Used for messages without a delivery time; the strings are only rebuilt
+        once per second since consecutive messages would get the same values.
+        """
+        now = int(time.time())
+        cached = self._now_cache
+        if cached[0] != now:
+            current = datetime.now()
+            cached = self._now_cache = (
+                now,
+                current.strftime('%a %b %d %H:%M:%S %Y'),
+                current.strftime('%a, %d %b %Y %H:%M:%S %z'),
+            )
+        return cached[1], cached[2]
+    
+    def build_email(self, record):
+        """Build an email.message.Message object from a dict returned by read_pst_message()."""
         try:
-            # Body content - use safe accessor to handle corrupted strings
-            body_text = self.safe_get_attr(pst_message, 'plain_text_body', '') or ""
-            body_html = self.safe_get_attr(pst_message, 'html_body', '') or ""
-            
-            # Extract attachments
-            attachments = self.extract_attachments(pst_message)
+            body_text = record['body_text']
+            body_html = record['body_html']
+            attachments = record['attachments']
             
             # Create appropriate message structure
             if attachments:
@@ -205,17 +458,15 @@ class PSTToMboxConverter:
                 else:
                     msg.attach(MIMEText(body_text or "(No content)", 'plain', 'utf-8'))
                 
-                # Add attachments
+                # Add attachments, with a short note in place of skipped ones
                 for att in attachments:
-                    if att['data']:
-                        part = MIMEBase('application', 'octet-stream')
-                        part.set_payload(att['data'])
-                        encoders.encode_base64(part)
-                        part.add_header(
-                            'Content-Disposition',
-                            f'attachment; filename="{att["filename"]}"'
-                        )
-                        msg.attach(part)
+                    if att['read'] is None:
+                        msg.attach(MIMEText(
+                            f"[Attachment '{att['filename']}' skipped: {att['size']} bytes]",
+                            'plain', 'utf-8'
+                        ))
+                    else:
+                        msg.attach(StreamedAttachment(att['read'], att['filename']))
             
             elif body_html and body_text:
                 # Both text and HTML - use multipart/alternative
@@ -232,82 +483,61 @@ class PSTToMboxConverter:
                 msg = MIMEText(body_text or "(No content)", 'plain', 'utf-8')
             
             # Add headers
-            subject = self.safe_get_attr(pst_message, 'subject', '') or "(No Subject)"
-            msg['Subject'] = subject
+            msg['Subject'] = record['subject'] or "(No Subject)"
 
             # Sender information
-            sender_name = self.safe_get_attr(pst_message, 'sender_name', '')
-            sender_email = self.safe_get_attr(pst_message, 'sender_email_address', '')
-
-            transport_headers = self.safe_get_attr(pst_message, 'transport_headers', '')
+            sender_name = record['sender_name']
+            sender_email = record['sender_email']
+            transport_headers = record['transport_headers']
 
             if not sender_email and transport_headers:
-                sender_match = re.search(r'^From:\s*(.+?)\s*<(.+?)>', transport_headers, re.MULTILINE | re.IGNORECASE)
+                sender_match = TRANSPORT_FROM_RE.search(transport_headers)
                 if sender_match:
                     sender_name = sender_match.group(1).strip('"')
                     sender_email = sender_match.group(2)
 
+            # Delivery date, falling back to the transport headers
+            delivery_time = record['delivery_time']
+            if not delivery_time and transport_headers:
+                date_match = TRANSPORT_DATE_RE.search(transport_headers)
+                if date_match:
+                    try:
+                        delivery_time = email.utils.parsedate_to_datetime(date_match.group(1).strip())
+                    except Exception:
+                        delivery_time = None
+
             if sender_email:
                 msg['From'] = self.format_email_address(sender_email, sender_name)
                 # Set mbox unix from line for correct sender display
-                delivery_time = self.safe_get_attr(pst_message, 'delivery_time', None)
-                if not delivery_time and transport_headers:
-                    date_match = re.search(r'^Date:\s*(.+)', transport_headers, re.MULTILINE | re.IGNORECASE)
-                    if date_match:
-                        try:
-                            delivery_time = email.utils.parsedate_to_datetime(date_match.group(1).strip())
-                        except Exception:
-                            delivery_time = None
                 if delivery_time:
                     unix_date = delivery_time.strftime('%a %b %d %H:%M:%S %Y')
                 else:
-                    unix_date = datetime.now().strftime('%a %b %d %H:%M:%S %Y')
+                    unix_date = self.fallback_dates()[0]
                 msg.set_unixfrom(f'From {sender_email} {unix_date}')
             
             # Recipients
-            recipients = []
-            try:
-                if hasattr(pst_message, 'recipients') and pst_message.recipients:
-                    for recipient in pst_message.recipients:
-                        recipient_email = self.safe_get_attr(recipient, 'email_address', '')
-                        recipient_name = self.safe_get_attr(recipient, 'name', '')
-                        if recipient_email:
-                            recipients.append(self.format_email_address(recipient_email, recipient_name))
-            except (SystemError, ValueError, UnicodeDecodeError, OverflowError) as e:
-                self.logger.debug(f"Failed to read recipients: {e}")
-            
+            recipients = [self.format_email_address(address, name) for address, name in record['recipients']]
             if recipients:
                 msg['To'] = ', '.join(recipients)
             
             # Date
-            delivery_time = self.safe_get_attr(pst_message, 'delivery_time', None)
-            if not delivery_time and transport_headers:
-                date_match = re.search(r'^Date:\s*(.+)', transport_headers, re.MULTILINE | re.IGNORECASE)
-                if date_match:
-                    try:
-                        delivery_time = email.utils.parsedate_to_datetime(date_match.group(1).strip())
-                    except Exception:
-                        delivery_time = None
-
             if delivery_time:
                 try:
                     msg['Date'] = delivery_time.strftime('%a, %d %b %Y %H:%M:%S %z')
                 except Exception:
                     msg['Date'] = delivery_time.isoformat()
             else:
-                msg['Date'] = datetime.now().strftime('%a, %d %b %Y %H:%M:%S %z')
+                msg['Date'] = self.fallback_dates()[1]
             
             # Message ID
-            if transport_headers and 'Message-ID:' in transport_headers:
-                try:
-                    msg_id = transport_headers.split('Message-ID:')[1].split('\n')[0].strip()
-                    msg['Message-ID'] = msg_id
-                except:
-                    pass
+            if transport_headers:
+                msgid_match = TRANSPORT_MSGID_RE.search(transport_headers)
+                if msgid_match:
+                    msg['Message-ID'] = msgid_match.group(1)
             
             # Add folder information as custom header
-            if folder_path:
-                msg['X-Folder'] = folder_path
+            if record['folder_path']:
+                msg['X-Folder'] = record['folder_path']
             
             return msg
             
@@ -315,36 +545,75 @@ class PSTToMboxConverter:
             self.logger.error(f"Failed to convert PST message: {e}")
             raise
     
+    def convert_pst_message_to_email(self, pst_message, folder_path=""):
+        """Convert a PST message to an email.message.Message object."""
+        return self.build_email(self.read_pst_message(pst_message, folder_path))
+    
+    def iter_messages(self, root_folder):
+        """
+        Yield (message, folder path) for every message below a PST folder.
+
+        Folders are walked breadth-first, in the same order as libratom's
+        messages(). A folder that cannot be read is logged and skipped.
+        """
+        folders = deque([(root_folder, "")])
+        while folders:
+            folder, folder_path = folders.popleft()
+            self.processed_folders += 1
+            failed = False
+            
+            try:
+                for pst_message in folder.sub_messages:
+                    yield pst_message, folder_path
+            except (OSError, SystemError, ValueError, UnicodeDecodeError, OverflowError) as e:
+                failed = True
+                self.logger.error(f"Failed to read messages of folder '{folder_path or '/'}': {e}")
+            
+            try:
+                for sub_folder in folder.sub_folders:
+                    name = self.safe_get_attr(sub_folder, 'name', '') or "Unknown"
+                    folders.append((sub_folder, f"{folder_path}/{name}" if folder_path else name))
+            except (OSError, SystemError, ValueError, UnicodeDecodeError, OverflowError) as e:
+                failed = True
+                self.logger.error(f"Failed to read subfolders of folder '{folder_path or '/'}': {e}")
+            
+            if failed:
+                self.failed_folders += 1
+    
     def process_messages(self, pst_archive, mbox_file):
         """Process all messages in the PST archive."""
         try:
             self.logger.info("Processing messages from PST archive...")
             
-            # Use libratom's messages() generator to iterate through all messages
-            message_count = 0
-            for pst_message in pst_archive.messages():
-                try:
-                    # Get folder path if available
-                    folder_path = "Unknown"
+            writer = MboxWriter(mbox_file)
+            try:
+                # Walk the folder tree directly so each message comes with its folder path
+                message_count = 0
+                for pst_message, folder_path in self.iter_messages(pst_archive.data.root_folder):
+                    message_count += 1
                     try:
-                        if hasattr(pst_message, 'folder') and pst_message.folder:
-                            folder_path = self.safe_get_attr(pst_message.folder, 'name', 'Unknown')
-                    except (SystemError, ValueError, UnicodeDecodeError, OverflowError):
-                        pass
+                        record = self.read_pst_message(pst_message, folder_path)
+                        writer.write_message(self.build_email(record))
+                        self.processed_emails += 1
+                        
+                        if self.processed_emails % 100 == 0:
+                            self.logger.info(f"Processed {self.processed_emails} emails...")
                     
-                    email_msg = self.convert_pst_message_to_email(pst_message, folder_path)
-                    mbox_file.add(email_msg)
-                    self.processed_emails += 1
-                    message_count += 1
+                    except Exception as e:
+                        self.failed_emails += 1
+                        self.logger.error(f"Failed to process message {message_count}: {e}")
                     
-                    if self.processed_emails % 100 == 0:
-                        self.logger.info(f"Processed {self.processed_emails} emails...")
-                
-                except Exception as e:
-                    self.failed_emails += 1
-                    self.logger.error(f"Failed to process message {message_count}: {e}")
+                    # Release this iteration's references right away instead of
+                    # keeping them alive until the next message has been read
+                    pst_message = record = None
+                    if message_count % GC_INTERVAL == 0:
+                        gc.collect(0)
+            
+            finally:
+                # Write out everything already batched, even if the walk was aborted
+                writer.flush()
             
-            self.logger.info(f"Finished processing {message_count} messages")
+            self.logger.info(f"Finished processing {self.processed_emails} messages")
         
         except Exception as e:
             self.logger.error(f"Failed to process messages: {e}")
@@ -363,20 +632,18 @@ class PSTToMboxConverter:
             pst_archive = self.open_pst_file()
             
             # Create mbox file
-            mbox_file = mailbox.mbox(str(self.output_file))
-            mbox_file.lock()
-            
-            try:
+            with open(self.output_file, 'wb') as mbox_file:
                 # Process all messages
                 self.process_messages(pst_archive, mbox_file)
-                
-                # Flush and close mbox file
+
+                # Flush mbox file to disk
                 mbox_file.flush()
-                
-            finally:
-                mbox_file.unlock()
-                mbox_file.close()
-            
+                os.fsync(mbox_file.fileno())
+
+                # The output is not read back, so release it from the page cache
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(mbox_file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
             # Calculate statistics
             end_time = time.time()
             duration = end_time - start_time
@@ -388,10 +655,15 @@ class PSTToMboxConverter:
             self.logger.info("="*50)
             self.logger.info(f"Input file: {self.pst_file}")
             self.logger.info(f"Output file: {self.output_file}")
+            self.logger.info(f"Processed folders: {self.processed_folders}")
+            if self.failed_folders:
+                self.logger.info(f"Failed folders: {self.failed_folders}")
             self.logger.info(f"Processed emails: {self.processed_emails}")
             self.logger.info(f"Failed emails: {self.failed_emails}")
             self.logger.info(f"Attachments found: {self.attachments_found}")
             self.logger.info(f"Attachments extracted: {self.attachments_extracted} ({self.attachment_bytes / (1024*1024):.2f} MB)")
+            if self.attachments_skipped:
+                self.logger.info(f"Attachments skipped (over {self.max_attachment_mb} MB): {self.attachments_skipped}")
             self.logger.info(f"Output file size: {output_size / (1024*1024):.2f} MB")
             self.logger.info(f"Processing time: {duration:.2f} seconds")
             
@@ -405,6 +677,17 @@ class PSTToMboxConverter:
             return False
 
 
+def non_negative_float(value):
+    """argparse type for options that accept a number of 0 or more."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more: {value!r}")
+    return number
+
+
 def main():
     """Main entry point."""
     parser = argparse.ArgumentParser(
@@ -434,6 +717,14 @@ Examples:
         help='Enable verbose output'
     )
     
+    parser.add_argument(
+        '--max-attachment-mb',
+        type=non_negative_float,
+        default=DEFAULT_MAX_ATTACHMENT_MB,
+        help=f'Replace attachments larger than this many MB with a placeholder, 0 for no limit '
+             f'(default: {DEFAULT_MAX_ATTACHMENT_MB})'
+    )
+    
     parser.add_argument(
         '--version',
         action='version',
@@ -443,7 +734,9 @@ Examples:
     args = parser.parse_args()
     
     # Create converter and run conversion
-    converter = PSTToMboxConverter(args.pst_file, args.output_file, args.verbose)
+    converter = PSTToMboxConverter(
+        args.pst_file, args.output_file, args.verbose, args.max_attachment_mb
+    )
     
     try:
         success = converter.convert()